@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import math
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Generic, Iterable, Iterator, List, TypeVar
+
+import pandas as pd
+
+from .storage import Database
+
+
+ANOMALY_Z_SCORE = 3.0
+ANOMALY_MIN_SAMPLES = 5
+MAX_ANOMALIES = 50
+MAX_STATEMENTS = 500
+MAX_MERCHANTS = 2000
+MAX_USERS = 1000
+SQL_BATCH_SIZE = 500
+RECURRING_MIN_MONTHS = 3
+RECURRING_MAX_VARIATION = 0.15
+MERCHANT_NOISE_PATTERN = re.compile(r"[\d\*\-]+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+T = TypeVar("T")
+
+
+def merchant_key(description: str) -> str:
+    cleaned = MERCHANT_NOISE_PATTERN.sub(" ", description.upper())
+    return WHITESPACE_PATTERN.sub(" ", cleaned).strip() or description.upper().strip()
+
+
+@dataclass
+class RunningStats:
+    """Welford accumulator: mean and variance in O(1) per new amount."""
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    total: float = 0.0
+    monthly_totals: Dict[str, float] = field(default_factory=dict)
+    monthly_counts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def z_score(self, amount: float) -> float | None:
+        if self.count < ANOMALY_MIN_SAMPLES or self.stddev == 0:
+            return None
+        return (amount - self.mean) / self.stddev
+
+    def add(self, amount: float, month: str | None) -> None:
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        self.total += amount
+        if month:
+            self.monthly_totals[month] = self.monthly_totals.get(month, 0.0) + amount
+            self.monthly_counts[month] = self.monthly_counts.get(month, 0) + 1
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": round(self.total, 2),
+            "mean": round(self.mean, 2),
+            "stddev": round(self.stddev, 2),
+            "monthly_totals": {
+                month: round(value, 2) for month, value in sorted(self.monthly_totals.items())
+            },
+        }
+
+
+def _month_index(month: str) -> int:
+    year, month_number = month.split("-")
+    return int(year) * 12 + int(month_number)
+
+
+@dataclass
+class MerchantStats(RunningStats):
+    category: str = "Otros"
+
+    @property
+    def is_recurring(self) -> bool:
+        """One charge per month, at a fixed cadence, for a steady monthly amount."""
+        months = sorted(self.monthly_totals)
+        if len(months) < RECURRING_MIN_MONTHS:
+            return False
+        if any(self.monthly_counts.get(month, 0) != 1 for month in months):
+            return False
+        indexes = [_month_index(month) for month in months]
+        if len({later - earlier for earlier, later in zip(indexes, indexes[1:])}) != 1:
+            return False
+        totals = [self.monthly_totals[month] for month in months]
+        mean_total = sum(totals) / len(totals)
+        if mean_total == 0:
+            return False
+        variance = sum((total - mean_total) ** 2 for total in totals) / (len(totals) - 1)
+        return math.sqrt(variance) / mean_total <= RECURRING_MAX_VARIATION
+
+    def to_dict(self) -> dict:
+        payload = super().to_dict()
+        payload["category"] = self.category
+        payload["recurring"] = self.is_recurring
+        return payload
+
+
+_KINDS = {RunningStats: "category", MerchantStats: "merchant"}
+
+
+def _chunks(values: List[str], size: int = SQL_BATCH_SIZE) -> Iterator[List[str]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+class SpendingHistory:
+    """Per-category and per-merchant aggregates of one user, kept in the shared database.
+
+    Each statement is folded in once via :meth:`update`, reading and writing back
+    only the categories and merchants it contains, so the cost of adding a
+    statement depends only on its own transactions, never on the stored history.
+    Every worker sees the same history and it survives restarts. Only the last
+    ``MAX_STATEMENTS`` statement ids are kept for de-duplication and merchants
+    beyond ``MAX_MERCHANTS`` only count towards their category.
+    """
+
+    def __init__(self, database: Database, user_id: str) -> None:
+        self._database = database
+        self.user_id = user_id
+
+    def update(self, df: pd.DataFrame, statement_id: str) -> bool:
+        """Fold a categorized DataFrame in; returns False if it was already seen."""
+        rows = list(df[["Fecha", "Descripción", "Monto", "Categoría"]].itertuples(index=False))
+        with self._database.transaction() as connection:
+            seen = connection.execute(
+                "SELECT 1 FROM seen_statements WHERE user_id = ? AND statement_id = ?",
+                (self.user_id, statement_id),
+            ).fetchone()
+            if seen is not None:
+                return False
+            connection.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (self.user_id,))
+            user = connection.execute(
+                "SELECT statements, merchants, untracked_merchants FROM users WHERE user_id = ?",
+                (self.user_id,),
+            ).fetchone()
+            statements_count = user["statements"] + 1
+            merchants_count = user["merchants"]
+            untracked_merchants = user["untracked_merchants"]
+            connection.execute(
+                "INSERT INTO seen_statements (user_id, statement_id, seq) VALUES (?, ?, ?)",
+                (self.user_id, statement_id, statements_count),
+            )
+            connection.execute(
+                "DELETE FROM seen_statements WHERE user_id = ? AND seq <= ?",
+                (self.user_id, statements_count - MAX_STATEMENTS),
+            )
+
+            categories = self._load(connection, RunningStats, {row[3] for row in rows})
+            merchants = self._load(
+                connection, MerchantStats, {merchant_key(row[1]) for row in rows}
+            )
+            anomalies = []
+            for date, description, amount, category in rows:
+                amount = float(amount)
+                month = date[:7] if isinstance(date, str) else None
+                merchant = merchant_key(description)
+
+                category_stats = categories.setdefault(category, RunningStats())
+                merchant_stats = merchants.get(merchant)
+                if merchant_stats is None and merchants_count < MAX_MERCHANTS:
+                    merchant_stats = merchants[merchant] = MerchantStats(category=category)
+                    merchants_count += 1
+                elif merchant_stats is None:
+                    untracked_merchants += 1
+
+                z_score = merchant_stats.z_score(amount) if merchant_stats else None
+                if z_score is None:
+                    z_score = category_stats.z_score(amount)
+                if z_score is not None and z_score >= ANOMALY_Z_SCORE:
+                    anomalies.append(
+                        (
+                            self.user_id,
+                            date if isinstance(date, str) else None,
+                            description,
+                            merchant,
+                            category,
+                            round(amount, 2),
+                            round(z_score, 2),
+                        )
+                    )
+
+                category_stats.add(amount, month)
+                if merchant_stats is not None:
+                    merchant_stats.category = category
+                    merchant_stats.add(amount, month)
+
+            self._store(connection, categories)
+            self._store(connection, merchants)
+            if anomalies:
+                connection.executemany(
+                    "INSERT INTO anomalies "
+                    "(user_id, date, description, merchant, category, amount, z_score) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    anomalies,
+                )
+                connection.execute(
+                    "DELETE FROM anomalies WHERE user_id = ? AND id <= ("
+                    "SELECT id FROM anomalies WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (self.user_id, self.user_id, MAX_ANOMALIES),
+                )
+            connection.execute(
+                "UPDATE users SET statements = ?, merchants = ?, untracked_merchants = ? "
+                "WHERE user_id = ?",
+                (statements_count, merchants_count, untracked_merchants, self.user_id),
+            )
+            return True
+
+    def _load(self, connection: sqlite3.Connection, stats_type: type, names: Iterable[str]) -> dict:
+        """Running stats for ``names``; monthly totals are not loaded, only accumulated."""
+        kind = _KINDS[stats_type]
+        loaded = {}
+        for batch in _chunks(sorted(names)):
+            placeholders = ", ".join("?" * len(batch))
+            for row in connection.execute(
+                "SELECT name, category, count, mean, m2, total FROM running_stats "
+                f"WHERE user_id = ? AND kind = ? AND name IN ({placeholders})",
+                (self.user_id, kind, *batch),
+            ):
+                stats = stats_type(
+                    count=row["count"], mean=row["mean"], m2=row["m2"], total=row["total"]
+                )
+                if isinstance(stats, MerchantStats):
+                    stats.category = row["category"]
+                loaded[row["name"]] = stats
+        return loaded
+
+    def _store(self, connection: sqlite3.Connection, stats_by_name: dict) -> None:
+        running, monthly = [], []
+        for name, stats in stats_by_name.items():
+            kind = _KINDS[type(stats)]
+            category = stats.category if isinstance(stats, MerchantStats) else None
+            running.append(
+                (self.user_id, kind, name, category, stats.count, stats.mean, stats.m2, stats.total)
+            )
+            monthly.extend(
+                (self.user_id, kind, name, month, total, stats.monthly_counts.get(month, 0))
+                for month, total in stats.monthly_totals.items()
+            )
+        connection.executemany(
+            "INSERT OR REPLACE INTO running_stats "
+            "(user_id, kind, name, category, count, mean, m2, total) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            running,
+        )
+        connection.executemany(
+            "INSERT INTO monthly_stats (user_id, kind, name, month, total, count) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (user_id, kind, name, month) DO UPDATE SET "
+            "total = total + excluded.total, count = count + excluded.count",
+            monthly,
+        )
+
+    def to_dict(self, merchant_limit: int | None = None) -> dict | None:
+        """The stored history, or None if this user never uploaded a statement."""
+        with self._database.snapshot() as connection:
+            user = connection.execute(
+                "SELECT statements, untracked_merchants FROM users WHERE user_id = ?",
+                (self.user_id,),
+            ).fetchone()
+            if user is None:
+                return None
+            stats_by_kind: Dict[str, dict] = {kind: {} for kind in _KINDS.values()}
+            for row in connection.execute(
+                "SELECT kind, name, category, count, mean, m2, total FROM running_stats "
+                "WHERE user_id = ?",
+                (self.user_id,),
+            ):
+                if row["kind"] == _KINDS[MerchantStats]:
+                    stats = MerchantStats(category=row["category"])
+                else:
+                    stats = RunningStats()
+                stats.count, stats.mean, stats.m2, stats.total = (
+                    row["count"], row["mean"], row["m2"], row["total"]
+                )
+                stats_by_kind[row["kind"]][row["name"]] = stats
+            for row in connection.execute(
+                "SELECT kind, name, month, total, count FROM monthly_stats WHERE user_id = ?",
+                (self.user_id,),
+            ):
+                stats = stats_by_kind[row["kind"]].get(row["name"])
+                if stats is not None:
+                    stats.monthly_totals[row["month"]] = row["total"]
+                    stats.monthly_counts[row["month"]] = row["count"]
+            anomalies = [
+                {
+                    "date": row["date"],
+                    "description": row["description"],
+                    "merchant": row["merchant"],
+                    "category": row["category"],
+                    "amount": row["amount"],
+                    "z_score": row["z_score"],
+                }
+                for row in connection.execute(
+                    "SELECT date, description, merchant, category, amount, z_score FROM anomalies "
+                    "WHERE user_id = ? ORDER BY id",
+                    (self.user_id,),
+                )
+            ]
+
+        categories = stats_by_kind[_KINDS[RunningStats]]
+        merchants = stats_by_kind[_KINDS[MerchantStats]]
+        ranked_merchants = sorted(merchants.items(), key=lambda item: item[1].total, reverse=True)
+        if merchant_limit is not None:
+            ranked_merchants = ranked_merchants[:merchant_limit]
+        recurring = [
+            {"merchant": name, **stats.to_dict()}
+            for name, stats in merchants.items()
+            if stats.is_recurring
+        ]
+        return {
+            "statements": user["statements"],
+            "untracked_merchants": user["untracked_merchants"],
+            "categories": {
+                name: stats.to_dict()
+                for name, stats in sorted(
+                    categories.items(), key=lambda item: item[1].total, reverse=True
+                )
+            },
+            "merchants": {name: stats.to_dict() for name, stats in ranked_merchants},
+            "recurring": sorted(recurring, key=lambda item: item["mean"], reverse=True),
+            "anomalies": anomalies,
+        }
+
+
+class UserRegistry(Generic[T]):
+    """One ``factory()`` instance per user, evicting the least recently used."""
+
+    def __init__(self, factory: Callable[[], T], max_users: int = MAX_USERS) -> None:
+        self._factory = factory
+        self._max_users = max_users
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, T]" = OrderedDict()
+
+    def get(self, user_id: str, create: bool = False) -> T | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None and create:
+                entry = self._entries[user_id] = self._factory()
+                if len(self._entries) > self._max_users:
+                    self._entries.popitem(last=False)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+            return entry
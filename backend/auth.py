@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import os
+import secrets
+from dataclasses import dataclass
+
+
+TOKEN_SEPARATOR = "."
+USER_ID_BYTES = 16
+SIGNATURE_LENGTH = 32
+
+
+@dataclass(frozen=True)
+class AnalyticsConfig:
+    admin_token: str | None = None
+    user_secret: str | None = None
+
+    @classmethod
+    def from_env(cls) -> "AnalyticsConfig":
+        return cls(
+            admin_token=os.getenv("ANALYTICS_ADMIN_TOKEN") or None,
+            user_secret=os.getenv("ANALYTICS_USER_SECRET") or None,
+        )
+
+    def is_admin(self, token: str | None) -> bool:
+        if not self.admin_token or not token:
+            return False
+        return hmac.compare_digest(token.encode("utf-8"), self.admin_token.encode("utf-8"))
+
+
+def _signature(secret: str, user_id: str) -> str:
+    digest = hmac.new(secret.encode("utf-8"), user_id.encode("utf-8"), hashlib.sha256).hexdigest()
+    return digest[:SIGNATURE_LENGTH]
+
+
+def issue_user_token(secret: str) -> tuple[str, str]:
+    """Create a new anonymous user and the signed token that identifies it."""
+    user_id = secrets.token_hex(USER_ID_BYTES)
+    return user_id, f"{user_id}{TOKEN_SEPARATOR}{_signature(secret, user_id)}"
+
+
+def verify_user_token(secret: str, token: str) -> str | None:
+    user_id, _, signature = token.partition(TOKEN_SEPARATOR)
+    if not user_id or not signature:
+        return None
+    if not hmac.compare_digest(signature, _signature(secret, user_id)):
+        return None
+    return user_id
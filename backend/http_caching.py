@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import hmac
+import secrets
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # pragma: no cover - optional dependency
+    import brotli
+except ImportError:  # pragma: no cover
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+RESULT_CACHE_SIZE = 64
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def make_etag(*parts: str, key: str = "") -> str:
+    """Keyed with a server secret so a tag cannot be derived offline from the inputs."""
+    message = "\x1f".join(parts).encode("utf-8")
+    digest = hmac.new(key.encode("utf-8"), message, hashlib.sha256).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_id(etag: str) -> str:
+    """The opaque tag without ``W/``, quotes or the content-coding suffix."""
+    opaque = etag.removeprefix("W/").strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        opaque = opaque.removesuffix(suffix)
+    return opaque
+
+
+def etag_matches(if_none_match: str | None, etag: str, allow_wildcard: bool = True) -> bool:
+    """Weak comparison, ignoring the content-coding suffix added on compression.
+
+    ``*`` only matches when the caller has an existing representation to compare
+    against (``allow_wildcard``); it never matches a fresh upload.
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    if "*" in candidates:
+        return allow_wildcard
+    target = etag_id(etag)
+    return any(etag_id(candidate) == target for candidate in candidates)
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    accepted = set()
+    for token in accept_encoding.split(","):
+        name, *params = [part.strip() for part in token.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def encoded_etag(etag: str, encoding: str | None) -> str:
+    if encoding is None or etag.startswith("W/"):
+        return etag
+    opaque = etag.strip('"')
+    return f'"{opaque}-{encoding}"'
+
+
+def representation_etag(
+    etag: str, body_size: int, accept_encoding: str, minimum_size: int = MIN_COMPRESS_SIZE
+) -> str:
+    """The validator :class:`CompressionMiddleware` would send with a 200 for this body."""
+    if body_size < minimum_size:
+        return etag
+    return encoded_etag(etag, negotiate_encoding(accept_encoding))
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    body: bytes
+    owner: str | None
+    password_digest: bytes | None
+
+
+class ResultCache:
+    """Bounded LRU of rendered analysis bodies keyed by ETag.
+
+    Serving the stored bytes keeps the ETag strong: a repeat request for the
+    same PDF, password and configuration gets exactly the same representation.
+    Entries remember which user session produced them so they are only served
+    back to that user. The ETag does not depend on the PDF password, so entries
+    also keep a keyed digest of it (in memory only): :meth:`opens_with` stops a
+    re-upload without the right password from reading a protected result.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE) -> None:
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._key = secrets.token_bytes(32)
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+
+    def _password_digest(self, password: str | None) -> bytes | None:
+        if not password:
+            return None
+        return hmac.new(self._key, password.encode("utf-8"), hashlib.sha256).digest()
+
+    def opens_with(self, entry: CachedResult, password: str | None) -> bool:
+        if entry.password_digest is None:
+            return True
+        candidate = self._password_digest(password)
+        return candidate is not None and hmac.compare_digest(candidate, entry.password_digest)
+
+    def get(self, etag: str, owner: str | None) -> CachedResult | None:
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is None or entry.owner != owner:
+                return None
+            self._entries.move_to_end(etag)
+            return entry
+
+    def put(self, etag: str, body: bytes, owner: str | None, password: str | None = None) -> None:
+        with self._lock:
+            self._entries[etag] = CachedResult(body, owner, self._password_digest(password))
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+class CompressionMiddleware:
+    """Compress single-chunk responses with brotli (if installed) or gzip.
+
+    Streaming responses, already-encoded bodies and bodies under
+    ``minimum_size`` bytes are passed through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MIN_COMPRESS_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            pending_start, start_message = start_message, None
+            headers = MutableHeaders(raw=pending_start["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+            ):
+                await send(pending_start)
+                await send(message)
+                return
+
+            body = self._compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag:
+                # Each content-coding is a distinct representation and needs its own strong tag.
+                headers["ETag"] = encoded_etag(etag, encoding)
+            await send(pending_start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _compress(body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
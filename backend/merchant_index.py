@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from .analytics import merchant_key
+from .storage import Database
+
+
+FALLBACK_CATEGORY = "Otros"
+MIN_CONFIDENCE = 0.5
+# A fuzzy match never reports the certainty of an exact keyword hit.
+MAX_FUZZY_CONFIDENCE = 0.99
+MIN_TERM_TRIGRAMS = 5
+CACHE_SIZE = 4096
+MAX_LEARNED_TERMS = 1000
+# Payment-channel words shared by unrelated merchants ("COMPRA POS EXITO",
+# "COMPRA POS FERRETERIA"); they must not drive the match.
+NOISE_TOKENS = frozenset(
+    {
+        "ABONO", "AUTOMATICO", "CARGO", "COM", "COMPRA", "DEBITO", "INTERNET", "PAGO",
+        "POS", "PSE", "SUC", "TRANSFERENCIA", "WEB", "WWW",
+    }
+)
+
+
+def _strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    grams: Set[str] = set()
+    for word in _strip_accents(text.upper()).split():
+        if word in NOISE_TOKENS:
+            continue
+        padded = f" {word} "
+        grams.update(padded[index : index + 3] for index in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+@dataclass(frozen=True)
+class FuzzyMatch:
+    category: str
+    confidence: float
+    term: str
+
+
+class MerchantIndex:
+    """Trigram inverted index over category keywords and learned merchants.
+
+    Only descriptions that fell through exact keyword matching are looked up.
+    The score is the Dice coefficient between the trigrams of a term and of the
+    description, ignoring payment-channel words. Results are kept in a bounded
+    LRU cache; adding or removing a term only evicts the cached descriptions
+    that share a trigram with it. At most ``max_learned_terms`` merchants are
+    learned (``0`` disables learning), dropping the least recently seen.
+    Learned merchants are persisted through :class:`LearnedTermStore`:
+    :meth:`drain_learned` hands over what was learned and :meth:`sync_learned`
+    applies the shared state.
+    """
+
+    def __init__(
+        self,
+        min_confidence: float = MIN_CONFIDENCE,
+        cache_size: int = CACHE_SIZE,
+        max_learned_terms: int = MAX_LEARNED_TERMS,
+    ) -> None:
+        self.min_confidence = min_confidence
+        self.learned_revision: int | None = None
+        self._fingerprint = 0
+        self._cache_size = cache_size
+        self._max_learned_terms = max_learned_terms
+        self._lock = threading.Lock()
+        self._keywords_signature: Tuple[Tuple[str, Tuple[str, ...]], ...] = ()
+        self._keyword_terms: Dict[str, str] = {}
+        self._learned_terms: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: "OrderedDict[str, str]" = OrderedDict()
+        self._term_ids: Dict[str, int] = {}
+        self._terms: List[Tuple[str, str, int] | None] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._cache: "OrderedDict[str, Tuple[FrozenSet[str], FuzzyMatch | None]]" = OrderedDict()
+        self._cache_postings: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._term_ids)
+
+    @property
+    def fingerprint(self) -> str:
+        """Order-independent digest of the indexed terms, equal across workers."""
+        return f"{self._fingerprint:016x}"
+
+    @staticmethod
+    def _term_digest(term: str, category: str) -> int:
+        digest = hashlib.blake2b(f"{term}\x1f{category}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    def sync_keywords(self, keywords_lookup: dict[str, Iterable[str]]) -> None:
+        signature = tuple((category, tuple(keywords)) for category, keywords in keywords_lookup.items())
+        with self._lock:
+            if signature == self._keywords_signature:
+                return
+            self._keywords_signature = signature
+            self._keyword_terms = {}
+            for category, keywords in signature:
+                for keyword in keywords:
+                    self._keyword_terms.setdefault(keyword.upper(), category)
+            self._rebuild()
+
+    def learn(self, description: str, category: str) -> None:
+        if category == FALLBACK_CATEGORY or self._max_learned_terms <= 0:
+            return
+        term = merchant_key(description)
+        with self._lock:
+            if term in self._keyword_terms:
+                return
+            self._pending[term] = category
+            self._pending.move_to_end(term)
+            current = self._learned_terms.get(term)
+            if current == category:
+                self._learned_terms.move_to_end(term)
+                return
+            if current is not None:
+                self._remove_term(term)
+            self._learned_terms[term] = category
+            self._add_term(term, category)
+            while len(self._learned_terms) > self._max_learned_terms:
+                evicted, _ = self._learned_terms.popitem(last=False)
+                self._remove_learned(evicted)
+
+    def drain_learned(self) -> List[Tuple[str, str]]:
+        """Terms seen by :meth:`learn` since the last call, oldest first."""
+        with self._lock:
+            pending, self._pending = list(self._pending.items()), OrderedDict()
+        return pending
+
+    def sync_learned(self, terms: Iterable[Tuple[str, str]], revision: int) -> None:
+        """Replace the learned merchants, only touching terms that changed."""
+        learned = OrderedDict(terms)
+        with self._lock:
+            for term, category in self._learned_terms.items():
+                if learned.get(term) != category:
+                    self._remove_learned(term)
+            for term, category in learned.items():
+                if self._learned_terms.get(term) != category and term not in self._keyword_terms:
+                    self._add_term(term, category)
+            self._learned_terms = learned
+            self.learned_revision = revision
+
+    def match(self, description: str) -> FuzzyMatch | None:
+        # Learned terms are stored as merchant keys, so reference numbers must not count either.
+        key = merchant_key(description)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+            grams = trigrams(key)
+            result = self._lookup(grams)
+            self._cache[key] = (grams, result)
+            for gram in grams:
+                self._cache_postings[gram].add(key)
+            if len(self._cache) > self._cache_size:
+                self._drop_cached(next(iter(self._cache)))
+            return result
+
+    def _rebuild(self) -> None:
+        self._term_ids = {}
+        self._terms = []
+        self._postings = defaultdict(list)
+        self._cache.clear()
+        self._cache_postings = defaultdict(set)
+        self._fingerprint = 0
+        for term, category in self._keyword_terms.items():
+            self._add_term(term, category)
+        for term, category in self._learned_terms.items():
+            if term not in self._keyword_terms:
+                self._add_term(term, category)
+
+    def _add_term(self, term: str, category: str) -> None:
+        grams = trigrams(term)
+        if len(grams) < MIN_TERM_TRIGRAMS or category == FALLBACK_CATEGORY:
+            return
+        term_id = len(self._terms)
+        self._terms.append((term, category, len(grams)))
+        self._term_ids[term] = term_id
+        self._fingerprint ^= self._term_digest(term, category)
+        for gram in grams:
+            self._postings[gram].append(term_id)
+        self._invalidate(grams)
+
+    def _remove_term(self, term: str) -> None:
+        term_id = self._term_ids.pop(term, None)
+        if term_id is None:
+            return
+        _, category, _ = self._terms[term_id]
+        self._fingerprint ^= self._term_digest(term, category)
+        self._terms[term_id] = None
+        self._invalidate(trigrams(term))
+        if len(self._terms) > 2 * len(self._term_ids) + 64:
+            self._compact()
+
+    def _remove_learned(self, term: str) -> None:
+        # A keyword added after the merchant was learned owns the term now.
+        if term not in self._keyword_terms:
+            self._remove_term(term)
+
+    def _compact(self) -> None:
+        """Drop tombstoned terms from the postings; cached results stay valid."""
+        active = [self._terms[term_id] for term_id in self._term_ids.values()]
+        self._term_ids = {}
+        self._terms = []
+        self._postings = defaultdict(list)
+        for term, category, size in active:
+            term_id = len(self._terms)
+            self._terms.append((term, category, size))
+            self._term_ids[term] = term_id
+            for gram in trigrams(term):
+                self._postings[gram].append(term_id)
+
+    def _invalidate(self, grams: FrozenSet[str]) -> None:
+        affected: Set[str] = set()
+        for gram in grams:
+            affected.update(self._cache_postings.get(gram, ()))
+        for description in affected:
+            self._drop_cached(description)
+
+    def _drop_cached(self, description: str) -> None:
+        grams, _ = self._cache.pop(description)
+        for gram in grams:
+            descriptions = self._cache_postings.get(gram)
+            if descriptions is not None:
+                descriptions.discard(description)
+                if not descriptions:
+                    del self._cache_postings[gram]
+
+    def _lookup(self, grams: FrozenSet[str]) -> FuzzyMatch | None:
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for term_id in self._postings.get(gram, ()):
+                if self._terms[term_id] is not None:
+                    shared[term_id] += 1
+
+        best: Tuple[float, int, str, str] | None = None
+        for term_id, count in shared.items():
+            term, category, term_size = self._terms[term_id]
+            dice = 2 * count / (term_size + len(grams))
+            candidate = (dice, len(term), term, category)
+            if candidate[0] >= self.min_confidence and (best is None or candidate > best):
+                best = candidate
+
+        if best is None:
+            return None
+        confidence, _, term, category = best
+        return FuzzyMatch(
+            category=category, confidence=min(round(confidence, 2), MAX_FUZZY_CONFIDENCE), term=term
+        )
+
+
+class LearnedTermStore:
+    """Learned merchants per user in the shared database.
+
+    Every worker syncs its in-memory :class:`MerchantIndex` from here before an
+    analysis, so the same PDF is categorized the same way whichever worker
+    serves it. A revision number per user avoids reloading unchanged terms.
+    """
+
+    def __init__(self, database: Database, max_terms: int = MAX_LEARNED_TERMS) -> None:
+        self._database = database
+        self._max_terms = max_terms
+
+    def refresh(self, user_id: str, index: MerchantIndex) -> None:
+        with self._database.snapshot() as connection:
+            row = connection.execute(
+                "SELECT revision FROM learned_revisions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            revision = row["revision"] if row else 0
+            if revision == index.learned_revision:
+                return
+            terms = [
+                (row["term"], row["category"])
+                for row in connection.execute(
+                    "SELECT term, category FROM learned_terms WHERE user_id = ? ORDER BY seq",
+                    (user_id,),
+                )
+            ]
+        index.sync_learned(terms, revision)
+
+    def save(self, user_id: str, learned: List[Tuple[str, str]]) -> None:
+        """Upsert terms in the order they were seen and drop the least recently seen."""
+        if not learned:
+            return
+        with self._database.transaction() as connection:
+            row = connection.execute(
+                "SELECT MAX(seq) AS seq FROM learned_terms WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            next_seq = (row["seq"] or 0) + 1
+            connection.executemany(
+                "INSERT INTO learned_terms (user_id, term, category, seq) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, term) DO UPDATE SET "
+                "category = excluded.category, seq = excluded.seq",
+                [
+                    (user_id, term, category, next_seq + offset)
+                    for offset, (term, category) in enumerate(learned)
+                ],
+            )
+            connection.execute(
+                "DELETE FROM learned_terms WHERE user_id = ? AND seq <= ("
+                "SELECT seq FROM learned_terms WHERE user_id = ? ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                (user_id, user_id, self._max_terms),
+            )
+            connection.execute(
+                "INSERT INTO learned_revisions (user_id, revision) VALUES (?, 1) "
+                "ON CONFLICT (user_id) DO UPDATE SET revision = revision + 1",
+                (user_id,),
+            )
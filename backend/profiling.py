@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+PSTATS_SUFFIX = ".pstats"
+COLLAPSED_SUFFIX = ".collapsed"
+
+
+def _env_float(name: str, default: float) -> float:
+    raw_value = os.getenv(name)
+    if not raw_value:
+        return default
+    try:
+        return float(raw_value)
+    except ValueError as exc:
+        raise ValueError(f"La variable {name} debe ser numérica (recibido {raw_value!r})") from exc
+
+
+@dataclass(frozen=True)
+class ProfilingConfig:
+    admin_token: str | None = None
+    sample_rate: float = 0.0
+    slow_threshold_ms: float = 5000.0
+    sampling_interval_ms: float = 5.0
+    max_profiles: int = 200
+    max_age_hours: float = 72.0
+    output_dir: Path = Path(tempfile.gettempdir()) / "statement-analyzer-profiles"
+
+    @classmethod
+    def from_env(cls) -> "ProfilingConfig":
+        defaults = cls()
+        output_dir = os.getenv("PROFILING_DIR")
+        return cls(
+            admin_token=os.getenv("PROFILING_ADMIN_TOKEN") or None,
+            sample_rate=min(max(_env_float("PROFILING_SAMPLE_RATE", defaults.sample_rate), 0.0), 1.0),
+            slow_threshold_ms=_env_float("PROFILING_SLOW_MS", defaults.slow_threshold_ms),
+            sampling_interval_ms=_env_float("PROFILING_INTERVAL_MS", defaults.sampling_interval_ms),
+            max_profiles=int(_env_float("PROFILING_MAX_FILES", defaults.max_profiles)),
+            max_age_hours=_env_float("PROFILING_MAX_AGE_HOURS", defaults.max_age_hours),
+            output_dir=Path(output_dir) if output_dir else defaults.output_dir,
+        )
+
+    def is_authorized(self, token: str | None) -> bool:
+        if not self.admin_token or not token:
+            return False
+        return hmac.compare_digest(token.encode("utf-8"), self.admin_token.encode("utf-8"))
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+
+class StackSampler(threading.Thread):
+    """Periodically snapshot one thread's Python stack, py-spy style."""
+
+    def __init__(self, target_thread_id: int, interval_ms: float) -> None:
+        super().__init__(name="stack-sampler", daemon=True)
+        self._target_thread_id = target_thread_id
+        self._interval = max(interval_ms, 0.5) / 1000.0
+        self._stop_event = threading.Event()
+        self.stacks: Counter[str] = Counter()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            frame = sys._current_frames().get(self._target_thread_id)  # pylint: disable=protected-access
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class ProfileSession:
+    """Run a block under cProfile plus a stack sampler and keep both outputs."""
+
+    def __init__(self, config: ProfilingConfig) -> None:
+        self._config = config
+        self._profiler = cProfile.Profile()
+        self._sampler = StackSampler(threading.get_ident(), config.sampling_interval_ms)
+        self._started_at = 0.0
+        self.elapsed_ms = 0.0
+
+    def __enter__(self) -> "ProfileSession":
+        self._sampler.start()
+        self._started_at = time.perf_counter()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._profiler.disable()
+        self.elapsed_ms = (time.perf_counter() - self._started_at) * 1000
+        self._sampler.stop()
+
+    def save(self) -> str:
+        profile_id = f"{int(time.time())}-{secrets.token_hex(4)}"
+        self._config.output_dir.mkdir(parents=True, exist_ok=True)
+        self._profiler.dump_stats(str(self._config.output_dir / f"{profile_id}{PSTATS_SUFFIX}"))
+        (self._config.output_dir / f"{profile_id}{COLLAPSED_SUFFIX}").write_text(
+            self._sampler.collapsed(), encoding="utf-8"
+        )
+        prune_profiles(self._config)
+        return profile_id
+
+
+def prune_profiles(config: ProfilingConfig) -> None:
+    """Keep at most ``max_profiles`` profiles, none older than ``max_age_hours``."""
+    profiles = []
+    for path in config.output_dir.glob(f"*{PSTATS_SUFFIX}"):
+        try:
+            profiles.append((path.stat().st_mtime, path))
+        except FileNotFoundError:  # removed by another worker meanwhile
+            continue
+    profiles.sort(reverse=True)
+
+    oldest_allowed = time.time() - config.max_age_hours * 3600
+    for index, (modified_at, path) in enumerate(profiles):
+        if index < config.max_profiles and modified_at >= oldest_allowed:
+            continue
+        for suffix in (PSTATS_SUFFIX, COLLAPSED_SUFFIX):
+            path.with_suffix(suffix).unlink(missing_ok=True)
+
+
+def profile_path(config: ProfilingConfig, profile_id: str, suffix: str) -> Path | None:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = config.output_dir / f"{profile_id}{suffix}"
+    return path if path.exists() else None
+
+
+def render_pstats(path: Path, limit: int = 40) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(str(path), stream=stream)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
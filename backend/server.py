@@ -3,15 +3,52 @@ from __future__ import annotations
 import logging
 from pathlib import Path
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, Header, HTTPException, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
 
-from .statement_analyzer import analyze_pdf_bytes
+from .analytics import SpendingHistory, UserRegistry
+from .auth import AnalyticsConfig, issue_user_token, verify_user_token
+from .http_caching import (
+    MIN_COMPRESS_SIZE,
+    CompressionMiddleware,
+    ResultCache,
+    etag_id,
+    etag_matches,
+    make_etag,
+    representation_etag,
+)
+from .merchant_index import LearnedTermStore, MerchantIndex
+from .profiling import (
+    COLLAPSED_SUFFIX,
+    PSTATS_SUFFIX,
+    ProfileSession,
+    ProfilingConfig,
+    profile_path,
+    render_pstats,
+)
+from .statement_analyzer import (
+    analyze_pdf_bytes,
+    config_version,
+    load_category_keywords,
+    pdf_fingerprint,
+)
+from .storage import Database
 
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Statement Analyzer", version="1.0.0")
+analytics_config = AnalyticsConfig.from_env()
+database = Database.from_env()
+user_secret = analytics_config.user_secret or database.shared_secret("user_secret")
+etag_secret = database.shared_secret("etag_secret")
+learned_terms = LearnedTermStore(database)
+# In-memory indexes per user; they are re-synced from ``learned_terms`` before each analysis.
+merchant_indexes = UserRegistry(MerchantIndex)
+# Anonymous uploads only get keyword-based fuzzy matching, they never teach the index.
+keyword_index = MerchantIndex(max_learned_terms=0)
+profiling_config = ProfilingConfig.from_env()
+result_cache = ResultCache()
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,7 +56,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Profile-Id"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=MIN_COMPRESS_SIZE)
 
 
 @app.get("/health", tags=["health"])
@@ -27,25 +66,101 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+def _require_admin(token: str | None) -> None:
+    if not profiling_config.is_authorized(token):
+        raise HTTPException(status_code=403, detail="Token de administrador inválido")
+
+
+def _current_user(authorization: str | None) -> str | None:
+    """The user id of a ``Bearer`` session token, or None for anonymous requests."""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    user_id = verify_user_token(user_secret, token.strip()) if scheme.lower() == "bearer" else None
+    if user_id is None:
+        raise HTTPException(status_code=403, detail="Sesión inválida, vuelve a iniciarla")
+    return user_id
+
+
+@app.post("/session", tags=["analysis"])
+async def create_session() -> dict[str, str]:
+    user_id, token = issue_user_token(user_secret)
+    return {"user_id": user_id, "token": token}
+
+
 @app.post("/analyze", tags=["analysis"])
 async def analyze(
     file: UploadFile = File(...),
     password: str | None = Form(default=None),
-) -> JSONResponse:
+    profile: bool = Query(default=False),
+    x_profile: bool = Header(default=False),
+    x_admin_token: str | None = Header(default=None),
+    if_none_match: str | None = Header(default=None),
+    authorization: str | None = Header(default=None),
+) -> Response:
+    user_id = _current_user(authorization)
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Solo se permiten archivos PDF")
 
+    profile_requested = profile or x_profile
+    if profile_requested:
+        _require_admin(x_admin_token)
+
     try:
         pdf_bytes = await file.read()
         if not pdf_bytes:
             raise HTTPException(status_code=400, detail="El archivo está vacío")
 
-        result = analyze_pdf_bytes(
-            pdf_bytes,
-            statement_label=Path(file.filename).stem,
-            password=password,
+        statement_label = Path(file.filename).stem
+        merchant_index = merchant_indexes.get(user_id, create=True) if user_id else keyword_index
+        merchant_index.sync_keywords(load_category_keywords())
+        if user_id:
+            learned_terms.refresh(user_id, merchant_index)
+        # The body depends on what the index has learned so far, so its state is part of the tag.
+        # The password is not: a wrong one is a 401 and any right one gives the same body.
+        etag = make_etag(
+            pdf_fingerprint(pdf_bytes),
+            config_version(),
+            app.version,
+            statement_label,
+            merchant_index.fingerprint,
+            key=etag_secret,
         )
-        return JSONResponse(result.to_dict())
+        if etag_matches(if_none_match, etag, allow_wildcard=False):
+            raise HTTPException(
+                status_code=412,
+                detail=f"El resultado ya está disponible en /results/{etag_id(etag)}",
+            )
+        if not profile_requested:
+            cached = result_cache.get(etag, owner=user_id)
+            if cached is not None and result_cache.opens_with(cached, password):
+                return Response(cached.body, media_type="application/json", headers={"ETag": etag})
+
+        analysis_kwargs = {
+            "statement_label": statement_label,
+            "password": password,
+            "history": SpendingHistory(database, user_id) if user_id else None,
+            "merchant_index": merchant_index,
+        }
+        headers = {"ETag": etag}
+        if profile_requested or profiling_config.should_sample():
+            with ProfileSession(profiling_config) as session:
+                result = analyze_pdf_bytes(pdf_bytes, **analysis_kwargs)
+            if profile_requested or session.elapsed_ms >= profiling_config.slow_threshold_ms:
+                try:
+                    profile_id = session.save()
+                except OSError:
+                    logger.exception("No se pudo guardar el perfil")
+                else:
+                    logger.info("Perfil %s guardado (%.0f ms)", profile_id, session.elapsed_ms)
+                    headers["X-Profile-Id"] = profile_id
+        else:
+            result = analyze_pdf_bytes(pdf_bytes, **analysis_kwargs)
+        if user_id:
+            learned_terms.save(user_id, merchant_index.drain_learned())
+        response = JSONResponse(result.to_dict(), headers=headers)
+        result_cache.put(etag, response.body, owner=user_id, password=password)
+        return response
     except HTTPException:
         logger.warning("Error HTTP")
         raise
@@ -55,3 +170,69 @@ async def analyze(
     except Exception as exc:  # pylint: disable=broad-except
         logger.exception("Error al procesar el PDF", exc_info=exc)
         raise HTTPException(status_code=500, detail="No se pudo procesar el PDF") from exc
+
+
+@app.get("/results/{result_id}", tags=["analysis"])
+async def get_result(
+    result_id: str,
+    if_none_match: str | None = Header(default=None),
+    accept_encoding: str = Header(default=""),
+    authorization: str | None = Header(default=None),
+) -> Response:
+    # Accept any form of the ETag: quoted or not, with or without the -br/-gzip suffix.
+    etag = f'"{etag_id(result_id)}"'
+    cached = result_cache.get(etag, owner=_current_user(authorization))
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Resultado no encontrado, vuelve a subir el PDF")
+    if etag_matches(if_none_match, etag):
+        validator = representation_etag(etag, len(cached.body), accept_encoding, MIN_COMPRESS_SIZE)
+        return Response(status_code=304, headers={"ETag": validator, "Vary": "Accept-Encoding"})
+    return Response(cached.body, media_type="application/json", headers={"ETag": etag})
+
+
+def _history_response(user_id: str, merchant_limit: int | None) -> JSONResponse:
+    payload = SpendingHistory(database, user_id).to_dict(merchant_limit=merchant_limit)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="No hay historial para este usuario")
+    return JSONResponse(payload)
+
+
+@app.get("/analytics", tags=["analysis"])
+async def my_analytics(
+    merchant_limit: int | None = Query(default=50, ge=1),
+    authorization: str | None = Header(default=None),
+) -> JSONResponse:
+    user_id = _current_user(authorization)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Se requiere una sesión")
+    return _history_response(user_id, merchant_limit)
+
+
+@app.get("/analytics/{user_id}", tags=["admin"])
+async def analytics(
+    user_id: str,
+    merchant_limit: int | None = Query(default=50, ge=1),
+    x_admin_token: str | None = Header(default=None),
+) -> JSONResponse:
+    if not analytics_config.is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Token de administrador inválido")
+    return _history_response(user_id, merchant_limit)
+
+
+@app.get("/profiles/{profile_id}", tags=["admin"])
+async def get_profile(
+    profile_id: str,
+    kind: str = Query(default="text", pattern="^(text|pstats|collapsed)$"),
+    x_admin_token: str | None = Header(default=None),
+):
+    _require_admin(x_admin_token)
+    suffix = COLLAPSED_SUFFIX if kind == "collapsed" else PSTATS_SUFFIX
+    path = profile_path(profiling_config, profile_id, suffix)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+
+    if kind == "pstats":
+        return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+    if kind == "collapsed":
+        return PlainTextResponse(path.read_text(encoding="utf-8"))
+    return PlainTextResponse(render_pstats(path))
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
+import hashlib
 import io
 import json
 import re
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
 from typing import Iterable, List
 
@@ -12,9 +12,14 @@ import pandas as pd
 import pdfplumber
 from pdfminer.pdfdocument import PDFPasswordIncorrect
 
+from .analytics import SpendingHistory
+from .merchant_index import FALLBACK_CATEGORY, MerchantIndex
+
 
 CONFIG_PATH = Path(__file__).with_name("category_keywords.json")
 CURRENCY_CODE = "COP"
+KEYWORD_MATCH = "keyword"
+FUZZY_MATCH = "fuzzy"
 PATTERN = re.compile(
     r"(\d{4}-\d{2}-\d{2})\s+([A-Za-zÀ-ÖØ-öø-ÿ0-9 \*\-]+?)\s+\$([\d\.,]+)"
 )
@@ -28,7 +33,6 @@ MONTH_PATTERN = re.compile(
 class AnalysisResult:
     statement: str
     currency: str
-    generated_at: str
     overall_total: float
     categories: List[dict]
     month: str | None = None
@@ -37,7 +41,6 @@ class AnalysisResult:
         return {
             "statement": self.statement,
             "currency": self.currency,
-            "generated_at": self.generated_at,
             "overall_total": self.overall_total,
             "categories": self.categories,
             "month": self.month,
@@ -73,6 +76,16 @@ def load_category_keywords(path: Path | None = None) -> dict[str, list[str]]:
     return normalized
 
 
+def config_version(path: Path | None = None) -> str:
+    target_path = Path(path) if path else CONFIG_PATH
+    raw_config = target_path.read_bytes() if target_path.exists() else b""
+    return hashlib.sha256(raw_config).hexdigest()[:16]
+
+
+def pdf_fingerprint(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
 def _normalize_amount(raw_amount: str) -> float:
     cleaned = raw_amount.replace(".", "").replace(",", ".")
     return float(cleaned)
@@ -134,14 +147,46 @@ def categorize(description: str, keywords_lookup: dict[str, Iterable[str]]) -> s
     for category, keywords in keywords_lookup.items():
         if any(keyword in upper_desc for keyword in keywords):
             return category
-    return "Otros"
+    return FALLBACK_CATEGORY
 
 
-def append_categories(df: pd.DataFrame, keywords_lookup: dict[str, list[str]]) -> pd.DataFrame:
+def append_categories(
+    df: pd.DataFrame,
+    keywords_lookup: dict[str, list[str]],
+    merchant_index: MerchantIndex | None = None,
+) -> pd.DataFrame:
     categorized = df.copy()
     categorized["Categoría"] = categorized["Descripción"].apply(
         lambda desc: categorize(desc, keywords_lookup)
     )
+    categorized["Confianza"] = 1.0
+    categorized["Coincidencia"] = KEYWORD_MATCH
+    residue = categorized["Categoría"] == FALLBACK_CATEGORY
+    categorized.loc[residue, "Confianza"] = None
+    categorized.loc[residue, "Coincidencia"] = None
+    if merchant_index is None:
+        return categorized
+
+    merchant_index.sync_keywords(keywords_lookup)
+    known = categorized.loc[~residue, ["Descripción", "Categoría"]].drop_duplicates()
+    for description, category in known.itertuples(index=False):
+        merchant_index.learn(description, category)
+
+    matches = {}
+    for description in categorized.loc[residue, "Descripción"].unique():
+        match = merchant_index.match(description)
+        if match is not None:
+            matches[description] = match
+    if matches:
+        fuzzy_rows = residue & categorized["Descripción"].isin(list(matches))
+        fuzzy_descriptions = categorized.loc[fuzzy_rows, "Descripción"]
+        categorized.loc[fuzzy_rows, "Categoría"] = fuzzy_descriptions.map(
+            lambda desc: matches[desc].category
+        )
+        categorized.loc[fuzzy_rows, "Confianza"] = fuzzy_descriptions.map(
+            lambda desc: matches[desc].confidence
+        )
+        categorized.loc[fuzzy_rows, "Coincidencia"] = FUZZY_MATCH
     return categorized
 
 
@@ -159,13 +204,15 @@ def build_payload(
         category_rows = (
             df[df["Categoría"] == category]
             .sort_values(["Fecha", "Descripción"], ascending=[True, True])
-            [["Fecha", "Descripción", "Monto"]]
+            [["Fecha", "Descripción", "Monto", "Confianza", "Coincidencia"]]
         )
         transactions = [
             {
                 "date": row["Fecha"],
                 "description": row["Descripción"],
                 "amount": round(float(row["Monto"]), 2),
+                "confidence": None if pd.isna(row["Confianza"]) else float(row["Confianza"]),
+                "match": None if pd.isna(row["Coincidencia"]) else row["Coincidencia"],
             }
             for row in category_rows.to_dict(orient="records")
         ]
@@ -177,11 +224,9 @@ def build_payload(
             }
         )
 
-    generated_at = datetime.utcnow().isoformat()
     return AnalysisResult(
         statement=statement_label,
         currency=CURRENCY_CODE,
-        generated_at=generated_at,
         overall_total=round(float(summary.sum()), 2),
         categories=categories_payload,
         month=df.attrs.get("month_label"),
@@ -189,7 +234,11 @@ def build_payload(
 
 
 def analyze_pdf_bytes(
-    pdf_bytes: bytes, statement_label: str, password: str | None = None
+    pdf_bytes: bytes,
+    statement_label: str,
+    password: str | None = None,
+    history: SpendingHistory | None = None,
+    merchant_index: MerchantIndex | None = None,
 ) -> AnalysisResult:
     keywords_lookup = load_category_keywords()
     df = extract_transactions_from_bytes(pdf_bytes, password=password)
@@ -197,12 +246,13 @@ def analyze_pdf_bytes(
         return AnalysisResult(
             statement=statement_label,
             currency=CURRENCY_CODE,
-            generated_at=datetime.utcnow().isoformat(),
             overall_total=0.0,
             categories=[],
         )
 
-    categorized_df = append_categories(df, keywords_lookup)
+    categorized_df = append_categories(df, keywords_lookup, merchant_index=merchant_index)
+    if history is not None:
+        history.update(categorized_df, statement_id=pdf_fingerprint(pdf_bytes))
     summary = build_category_summary(categorized_df)
     return build_payload(categorized_df, summary, statement_label)
 
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import os
+import secrets
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "statement-analyzer.sqlite3"
+BUSY_TIMEOUT_SECONDS = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    statements INTEGER NOT NULL DEFAULT 0,
+    merchants INTEGER NOT NULL DEFAULT 0,
+    untracked_merchants INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS seen_statements (
+    user_id TEXT NOT NULL,
+    statement_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (user_id, statement_id)
+);
+CREATE INDEX IF NOT EXISTS seen_statements_seq ON seen_statements (user_id, seq);
+CREATE TABLE IF NOT EXISTS running_stats (
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT,
+    count INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    m2 REAL NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (user_id, kind, name)
+);
+CREATE TABLE IF NOT EXISTS monthly_stats (
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    month TEXT NOT NULL,
+    total REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, kind, name, month)
+);
+CREATE TABLE IF NOT EXISTS anomalies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    date TEXT,
+    description TEXT NOT NULL,
+    merchant TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    z_score REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS anomalies_user ON anomalies (user_id, id);
+CREATE TABLE IF NOT EXISTS learned_terms (
+    user_id TEXT NOT NULL,
+    term TEXT NOT NULL,
+    category TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (user_id, term)
+);
+CREATE INDEX IF NOT EXISTS learned_terms_seq ON learned_terms (user_id, seq);
+CREATE TABLE IF NOT EXISTS learned_revisions (
+    user_id TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL
+);
+"""
+
+
+class Database:
+    """SQLite file shared by every worker (WAL mode, one connection per process).
+
+    It holds each user's spending history and learned merchants. Writes go through :meth:`transaction`, which takes SQLite's write lock up
+    front so read-modify-write updates from different workers never interleave.
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_DB_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None, check_same_thread=False
+        )
+        self._connection.row_factory = sqlite3.Row
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> "Database":
+        return cls(os.getenv("ANALYTICS_DB") or DEFAULT_DB_PATH)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    @contextmanager
+    def snapshot(self) -> Iterator[sqlite3.Connection]:
+        """Consistent read-only view across several queries."""
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                yield self._connection
+            finally:
+                self._connection.execute("COMMIT")
+
+    def setting(self, key: str, default: str | None = None) -> str | None:
+        """Read a setting, storing ``default`` first if none exists yet."""
+        with self.transaction() as connection:
+            if default is not None:
+                connection.execute(
+                    "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)", (key, default)
+                )
+            row = connection.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def shared_secret(self, key: str) -> str:
+        """A random secret generated once and then shared by every worker."""
+        return self.setting(key, default=secrets.token_hex(32))
@@ -17,6 +17,7 @@ const passwordInput = document.getElementById("password-input");
 const passwordHint = document.getElementById("password-hint");
 const passwordCancel = document.getElementById("password-cancel");
 const statementLabelEl = document.getElementById("statement-label");
+const recentResultsSelect = document.getElementById("recent-results");
 
 const categoryTemplate = document.getElementById("category-item-template");
 const tableTemplate = document.getElementById("transactions-table-template");
@@ -29,6 +30,10 @@ let searchQuery = "";
 let pendingFile = null;
 let pendingPassword = null;
 
+const MAX_CACHED_RESULTS = 10;
+const SESSION_STORAGE_KEY = "statement-analyzer-session";
+const cachedResults = new Map();
+
 const currencyFormatter = new Intl.NumberFormat("es-CO", {
   style: "currency",
   currency: "COP",
@@ -87,6 +92,11 @@ function renderTransactions(transactions, label) {
     amountCell.textContent = currencyFormatter.format(tx.amount);
     amountCell.classList.add("numeric");
 
+    if (tx.match === "fuzzy") {
+      row.classList.add("uncertain");
+      row.title = `Categoría sugerida (confianza ${Math.round(tx.confidence * 100)}%)`;
+    }
+
     row.appendChild(dateCell);
     row.appendChild(descriptionCell);
     row.appendChild(amountCell);
@@ -152,6 +162,66 @@ resetButton.addEventListener("click", () => {
   renderAllTransactions();
 });
 
+function resultIdFromEtag(etag) {
+  return (etag || "").replace(/^W\//, "").replace(/"/g, "").replace(/-(br|gzip)$/, "");
+}
+
+function rememberResult(resultId, data) {
+  cachedResults.delete(resultId);
+  cachedResults.set(resultId, data);
+  if (cachedResults.size > MAX_CACHED_RESULTS) {
+    cachedResults.delete(cachedResults.keys().next().value);
+  }
+  renderRecentResults(resultId);
+}
+
+function renderRecentResults(selectedId) {
+  recentResultsSelect.innerHTML = '<option value="">Extractos recientes</option>';
+  [...cachedResults.entries()].reverse().forEach(([resultId, data]) => {
+    const option = document.createElement("option");
+    option.value = resultId;
+    option.textContent = data.month ? `${data.statement} · ${data.month}` : data.statement;
+    option.selected = option.defaultSelected = resultId === selectedId;
+    recentResultsSelect.appendChild(option);
+  });
+  recentResultsSelect.classList.toggle("hidden", cachedResults.size === 0);
+}
+
+async function readError(response) {
+  const payload = await response.json().catch(() => ({}));
+  const error = new Error(payload.detail || "No se pudo procesar el PDF");
+  error.status = response.status;
+  error.responsePayload = payload;
+  return error;
+}
+
+async function sessionToken() {
+  let token = localStorage.getItem(SESSION_STORAGE_KEY);
+  if (!token) {
+    const response = await fetch(`${API_BASE_URL}/session`, { method: "POST" });
+    if (!response.ok) {
+      throw await readError(response);
+    }
+    token = (await response.json()).token;
+    localStorage.setItem(SESSION_STORAGE_KEY, token);
+  }
+  return token;
+}
+
+async function apiFetch(path, options = {}, retry = true) {
+  const token = await sessionToken();
+  const response = await fetch(`${API_BASE_URL}${path}`, {
+    ...options,
+    headers: { ...(options.headers || {}), Authorization: `Bearer ${token}` },
+  });
+  if (response.status === 403 && retry) {
+    // The backend no longer accepts this session (its secret changed): start a new one.
+    localStorage.removeItem(SESSION_STORAGE_KEY);
+    return apiFetch(path, options, false);
+  }
+  return response;
+}
+
 async function submitAnalysis(file, password) {
   const formData = new FormData();
   formData.append("file", file);
@@ -159,20 +229,68 @@ async function submitAnalysis(file, password) {
     formData.append("password", password);
   }
 
-  const response = await fetch(`${API_BASE_URL}/analyze`, {
+  const response = await apiFetch("/analyze", {
     method: "POST",
     body: formData,
   });
+  if (!response.ok) {
+    throw await readError(response);
+  }
+
+  const data = await response.json();
+  const resultId = resultIdFromEtag(response.headers.get("ETag"));
+  if (resultId) {
+    rememberResult(resultId, data);
+  }
+  return data;
+}
 
+async function fetchResult(resultId) {
+  // Revalidate without uploading the PDF again; a 304 means our copy is current.
+  const cached = cachedResults.get(resultId);
+  const response = await apiFetch(`/results/${resultId}`, {
+    headers: cached ? { "If-None-Match": `"${resultId}"` } : {},
+  });
+  if (response.status === 304 && cached) {
+    return cached;
+  }
+  if (response.status === 404 && cached) {
+    // The server restarted or evicted it; the local copy is still a valid result.
+    return cached;
+  }
   if (!response.ok) {
-    const payload = await response.json().catch(() => ({}));
-    const error = new Error(payload.detail || "No se pudo procesar el PDF");
-    error.status = response.status;
-    error.responsePayload = payload;
-    throw error;
+    throw await readError(response);
+  }
+  const data = await response.json();
+  rememberResult(resultId, data);
+  return data;
+}
+
+function renderAnalysis(data) {
+  categoriesData = (data.categories || []).sort((a, b) => b.total - a.total);
+  flattenedTransactions = categoriesData.flatMap((category) =>
+    category.transactions.map((tx) => ({ ...tx, category: category.name }))
+  );
+
+  overallTotal = data.overall_total || 0;
+  overallTotalEl.textContent = currencyFormatter.format(overallTotal);
+  const monthLabel = data.month ? data.month : data.statement;
+  if (statementLabelEl) {
+    statementLabelEl.textContent = `${data.statement || "Extracto"} · ${monthLabel}`;
+  }
+  searchInput.disabled = categoriesData.length === 0;
+  searchInput.value = "";
+  clearSearchButton.classList.add("hidden");
+  searchQuery = "";
+
+  if (categoriesData.length === 0) {
+    categoriesList.innerHTML = '<p class="empty-state">No se encontraron gastos.</p>';
+    renderAllTransactions();
+    return;
   }
 
-  return response.json();
+  renderCategories(categoriesData);
+  handleCategorySelection(categoriesData[0]);
 }
 
 form.addEventListener("submit", async (event) => {
@@ -191,31 +309,7 @@ form.addEventListener("submit", async (event) => {
   form.classList.add("loading");
 
   try {
-    const data = await submitAnalysis(file, null);
-    categoriesData = (data.categories || []).sort((a, b) => b.total - a.total);
-    flattenedTransactions = categoriesData.flatMap((category) =>
-      category.transactions.map((tx) => ({ ...tx, category: category.name }))
-    );
-
-    overallTotal = data.overall_total || 0;
-    overallTotalEl.textContent = currencyFormatter.format(overallTotal);
-    const monthLabel = data.month ? data.month : data.statement;
-    if (statementLabelEl) {
-      statementLabelEl.textContent = `${data.statement || "Extracto"} · ${monthLabel}`;
-    }
-    searchInput.disabled = categoriesData.length === 0;
-    searchInput.value = "";
-    clearSearchButton.classList.add("hidden");
-    searchQuery = "";
-
-    if (categoriesData.length === 0) {
-      categoriesList.innerHTML = '<p class="empty-state">No se encontraron gastos.</p>';
-      renderAllTransactions();
-      return;
-    }
-
-    renderCategories(categoriesData);
-    handleCategorySelection(categoriesData[0]);
+    renderAnalysis(await submitAnalysis(file, null));
   } catch (error) {
     console.error(error);
     pendingFile = file;
@@ -246,27 +340,7 @@ passwordForm.addEventListener("submit", async (event) => {
   form.classList.add("loading");
 
   try {
-    const data = await submitAnalysis(pendingFile, pendingPassword);
-    categoriesData = (data.categories || []).sort((a, b) => b.total - a.total);
-    flattenedTransactions = categoriesData.flatMap((category) =>
-      category.transactions.map((tx) => ({ ...tx, category: category.name }))
-    );
-
-    overallTotal = data.overall_total || 0;
-    overallTotalEl.textContent = currencyFormatter.format(overallTotal);
-    searchInput.disabled = categoriesData.length === 0;
-    searchInput.value = "";
-    clearSearchButton.classList.add("hidden");
-    searchQuery = "";
-
-    if (categoriesData.length === 0) {
-      categoriesList.innerHTML = '<p class="empty-state">No se encontraron gastos.</p>';
-      renderAllTransactions();
-      return;
-    }
-
-    renderCategories(categoriesData);
-    handleCategorySelection(categoriesData[0]);
+    renderAnalysis(await submitAnalysis(pendingFile, pendingPassword));
   } catch (error) {
     console.error(error);
     if (error.status === 401) {
@@ -283,6 +357,21 @@ passwordForm.addEventListener("submit", async (event) => {
   }
 });
 
+recentResultsSelect.addEventListener("change", async () => {
+  const resultId = recentResultsSelect.value;
+  if (!resultId) return;
+  clearError();
+  form.classList.add("loading");
+  try {
+    renderAnalysis(await fetchResult(resultId));
+  } catch (error) {
+    console.error(error);
+    showError(error.message);
+  } finally {
+    form.classList.remove("loading");
+  }
+});
+
 passwordCancel.addEventListener("click", () => {
   pendingFile = null;
   pendingPassword = null;
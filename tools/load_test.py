@@ -0,0 +1,586 @@
+"""Load-test the /analyze endpoint with synthetic statements.
+
+Runs entirely locally with the standard library: it generates statement PDFs
+(optionally RC4-encrypted), drives ``/analyze`` at a fixed arrival rate and
+reports throughput, latency percentiles, error rates and server CPU/RSS.
+
+Examples::
+
+    python tools/load_test.py --url http://localhost:8080/api --rate 5 --duration 60
+    python tools/load_test.py --rate 10 --encrypted-ratio 0.2 --duplicate-rate 0.3 \\
+        --container "$(docker compose ps -q backend)" --label workers-4 --output workers-4.json
+    python tools/load_test.py --rate 10 --compare workers-1.json --output workers-4.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import statistics
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+KEYWORDS_PATH = ROOT_DIR / "backend" / "category_keywords.json"
+UNKNOWN_MERCHANTS = ["PAGO PSE", "TRANSFERENCIA NEQUI", "TIENDA D1", "PEAJE ACP", "COMPRA POS"]
+MONTHS = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre",
+]
+LINES_PER_PAGE = 60
+PASSWORD_PADDING = bytes.fromhex(
+    "28bf4e5e4e758a4164004e56fffa01082e2e00b6d0683e802f0ca9fe6453697a"
+)
+
+
+# === SYNTHETIC STATEMENTS ===
+def _rc4(key: bytes, data: bytes) -> bytes:
+    state = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + state[i] + key[i % len(key)]) % 256
+        state[i], state[j] = state[j], state[i]
+    out = bytearray()
+    i = j = 0
+    for byte in data:
+        i = (i + 1) % 256
+        j = (j + state[i]) % 256
+        state[i], state[j] = state[j], state[i]
+        out.append(byte ^ state[(state[i] + state[j]) % 256])
+    return bytes(out)
+
+
+def _standard_security(password: str, file_id: bytes) -> tuple[bytes, bytes, bytes, int]:
+    """Revision 2 (40-bit RC4) standard security handler values: key, O, U, P."""
+    padded = (password.encode("latin-1") + PASSWORD_PADDING)[:32]
+    owner_key = hashlib.md5(padded).digest()[:5]
+    owner_entry = _rc4(owner_key, padded)
+    permissions = -44
+    key = hashlib.md5(padded + owner_entry + struct.pack("<i", permissions) + file_id).digest()[:5]
+    user_entry = _rc4(key, PASSWORD_PADDING)
+    return key, owner_entry, user_entry, permissions
+
+
+def _escape_pdf_text(text: str) -> bytes:
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return escaped.encode("latin-1", errors="replace")
+
+
+def build_statement_pdf(
+    lines: List[str], password: str | None = None, file_id: bytes | None = None
+) -> bytes:
+    pages = [lines[i : i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    file_id = file_id or hashlib.md5(uuid.uuid4().bytes).digest()
+    encryption = _standard_security(password, file_id) if password else None
+
+    objects: Dict[int, bytes] = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    page_refs = []
+    for index, page_lines in enumerate(pages):
+        page_num, content_num = 4 + index * 2, 5 + index * 2
+        content = b"BT /F1 9 Tf 11 TL 40 800 Td " + b"".join(
+            b"(" + _escape_pdf_text(line) + b") Tj T* " for line in page_lines
+        ) + b"ET"
+        if encryption:
+            object_key = hashlib.md5(
+                encryption[0] + content_num.to_bytes(3, "little") + b"\x00\x00"
+            ).digest()[:10]
+            content = _rc4(object_key, content)
+        objects[content_num] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+        objects[page_num] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_num
+        )
+        page_refs.append(b"%d 0 R" % page_num)
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(page_refs), len(pages))
+
+    trailer_extra = b""
+    if encryption:
+        _, owner_entry, user_entry, permissions = encryption
+        encrypt_num = max(objects) + 1
+        objects[encrypt_num] = b"<< /Filter /Standard /V 1 /R 2 /O <%s> /U <%s> /P %d >>" % (
+            owner_entry.hex().encode(),
+            user_entry.hex().encode(),
+            permissions,
+        )
+        trailer_extra = b" /Encrypt %d 0 R" % encrypt_num
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(output)
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+    xref_offset = len(output)
+    size = max(objects) + 1
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for number in range(1, size):
+        output += b"%010d 00000 n \n" % offsets[number]
+    output += b"trailer\n<< /Size %d /Root 1 0 R /ID [<%s> <%s>]%s >>\nstartxref\n%d\n%%%%EOF\n" % (
+        size,
+        file_id.hex().encode(),
+        file_id.hex().encode(),
+        trailer_extra,
+        xref_offset,
+    )
+    return bytes(output)
+
+
+def synthetic_lines(rng: random.Random, transactions: int, merchants: List[str]) -> List[str]:
+    start = date(2025, rng.randint(1, 12), 1)
+    lines = [f"Extracto de {MONTHS[start.month - 1]} {start.year}"]
+    for _ in range(transactions):
+        day = start + timedelta(days=rng.randint(0, 27))
+        merchant = rng.choice(merchants)
+        amount = f"{rng.randint(2_000, 900_000):,}".replace(",", ".")
+        lines.append(f"{day.isoformat()} {merchant} ${amount},00")
+    return lines
+
+
+def load_merchants() -> List[str]:
+    merchants = list(UNKNOWN_MERCHANTS)
+    if KEYWORDS_PATH.exists():
+        for keywords in json.loads(KEYWORDS_PATH.read_text(encoding="utf-8")).values():
+            merchants.extend(str(keyword).upper() for keyword in keywords if keyword)
+    return [merchant for merchant in merchants if all(char not in merchant for char in "&.,/'")]
+
+
+@dataclass
+class Statement:
+    pdf_bytes: bytes
+    transactions: int
+    password: str | None
+
+
+class StatementMix:
+    """Pre-generated pool of statements; duplicates resend a previously sent PDF."""
+
+    def __init__(self, args: argparse.Namespace, rng: random.Random) -> None:
+        self._rng = rng
+        self._duplicate_rate = args.duplicate_rate
+        merchants = load_merchants()
+        self._fresh: List[Statement] = []
+        pool_size = args.pool_size or math.ceil(args.rate * args.duration * (1 - args.duplicate_rate)) + 1
+        for index in range(pool_size):
+            size = args.sizes[index % len(args.sizes)]
+            password = args.password if rng.random() < args.encrypted_ratio else None
+            lines = synthetic_lines(rng, size, merchants)
+            pdf_bytes = build_statement_pdf(lines, password, file_id=rng.randbytes(16))
+            self._fresh.append(Statement(pdf_bytes, size, password))
+        self._sent: List[Statement] = []
+        self._lock = threading.Lock()
+
+    def next(self) -> tuple[Statement, bool]:
+        with self._lock:
+            if self._sent and self._rng.random() < self._duplicate_rate:
+                return self._rng.choice(self._sent), True
+            statement = self._fresh[len(self._sent) % len(self._fresh)]
+            self._sent.append(statement)
+            return statement, False
+
+
+# === HTTP CLIENT ===
+def _multipart_body(statement: Statement) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = [
+        (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="statement.pdf"\r\n'
+            "Content-Type: application/pdf\r\n\r\n"
+        ).encode()
+        + statement.pdf_bytes
+        + b"\r\n"
+    ]
+    if statement.password:
+        parts.append(
+            (
+                f"--{boundary}\r\n"
+                'Content-Disposition: form-data; name="password"\r\n\r\n'
+                f"{statement.password}\r\n"
+            ).encode()
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+@dataclass
+class Sample:
+    scheduled_at: float
+    latency_ms: float
+    status: int
+    transactions: int
+    encrypted: bool
+    duplicate: bool
+    response_bytes: int
+
+
+def send(url: str, statement: Statement, duplicate: bool, scheduled_at: float, timeout: float) -> Sample:
+    body, content_type = _multipart_body(statement)
+    request = urllib.request.Request(
+        f"{url.rstrip('/')}/analyze",
+        data=body,
+        method="POST",
+        headers={"Content-Type": content_type, "Accept-Encoding": "gzip"},
+    )
+    status, size = 0, 0
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, size = response.status, len(response.read())
+    except urllib.error.HTTPError as exc:
+        status, size = exc.code, len(exc.read() or b"")
+    except (urllib.error.URLError, TimeoutError, ConnectionError):
+        status = 0
+    # Latency is measured from the scheduled start so queueing in the client counts.
+    latency_ms = (time.perf_counter() - scheduled_at) * 1000
+    return Sample(
+        scheduled_at, latency_ms, status, statement.transactions, bool(statement.password), duplicate, size
+    )
+
+
+# === RESOURCE SAMPLING ===
+def _proc_tree(pid: int) -> List[int]:
+    pids = [pid]
+    for task in Path(f"/proc/{pid}/task").glob("*"):
+        try:
+            children = (task / "children").read_text().split()
+        except OSError:
+            continue
+        for child in children:
+            pids.extend(_proc_tree(int(child)))
+    return pids
+
+
+def _proc_usage(pid: int) -> tuple[float, float]:
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    rss_mb = int(fields[21]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    return cpu_seconds, rss_mb
+
+
+class SamplingError(Exception):
+    """CPU/RSS of the target could not be read."""
+
+
+class ResourceSampler(threading.Thread):
+    """Poll CPU% and RSS of a local process tree or a docker container."""
+
+    def __init__(self, pid: int | None, container: str | None, interval: float = 1.0) -> None:
+        super().__init__(name="resource-sampler", daemon=True)
+        self._pid = pid
+        self._container = container
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._previous: Dict[int, float] = {}
+        self.samples: List[dict] = []
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._container or self._pid)
+
+    def sample(self) -> dict:
+        try:
+            if self._container:
+                return self._docker_sample()
+            return self._proc_sample(self._previous)
+        except subprocess.CalledProcessError as exc:
+            raise SamplingError((exc.stderr or str(exc)).strip()) from exc
+        except (OSError, ValueError, StopIteration, subprocess.SubprocessError) as exc:
+            raise SamplingError(str(exc) or type(exc).__name__) from exc
+
+    def run(self) -> None:
+        while self.enabled and not self._stop_event.wait(self._interval):
+            try:
+                self.samples.append(self.sample())
+            except SamplingError as exc:
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"Aviso: no se pudo muestrear CPU/RSS: {exc}", file=sys.stderr)
+
+    def _docker_sample(self) -> dict:
+        output = subprocess.run(
+            ["docker", "stats", "--no-stream", "--format", "{{.CPUPerc}};{{.MemUsage}}", self._container],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=10,
+        ).stdout.strip()
+        cpu, memory = output.split(";")
+        used = memory.split("/")[0].strip()
+        units = {"KiB": 1 / 1024, "MiB": 1, "GiB": 1024, "B": 1 / 1024 / 1024}
+        unit = next(suffix for suffix in units if used.endswith(suffix))
+        return {"cpu_percent": float(cpu.rstrip("%")), "rss_mb": float(used[: -len(unit)]) * units[unit]}
+
+    def _proc_sample(self, previous: Dict[int, float]) -> dict:
+        workers = {}
+        for pid in _proc_tree(self._pid):
+            try:
+                cpu_seconds, rss_mb = _proc_usage(pid)
+            except OSError:
+                continue
+            cpu_percent = (cpu_seconds - previous.get(pid, cpu_seconds)) / self._interval * 100
+            previous[pid] = cpu_seconds
+            workers[str(pid)] = {"cpu_percent": round(cpu_percent, 1), "rss_mb": round(rss_mb, 1)}
+        if not workers:
+            raise ValueError(f"el proceso {self._pid} no existe")
+        return {
+            "cpu_percent": sum(worker["cpu_percent"] for worker in workers.values()),
+            "rss_mb": sum(worker["rss_mb"] for worker in workers.values()),
+            "workers": workers,
+        }
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def summary(self) -> dict | None:
+        if not self.samples:
+            return None
+        cpu = [sample["cpu_percent"] for sample in self.samples]
+        rss = [sample["rss_mb"] for sample in self.samples]
+        summary = {
+            "cpu_percent_mean": round(statistics.fmean(cpu), 1),
+            "cpu_percent_max": round(max(cpu), 1),
+            "rss_mb_mean": round(statistics.fmean(rss), 1),
+            "rss_mb_max": round(max(rss), 1),
+        }
+        per_worker: Dict[str, dict] = {}
+        for sample in self.samples:
+            for pid, usage in sample.get("workers", {}).items():
+                worker = per_worker.setdefault(pid, {"cpu_percent_max": 0.0, "rss_mb_max": 0.0})
+                worker["cpu_percent_max"] = max(worker["cpu_percent_max"], usage["cpu_percent"])
+                worker["rss_mb_max"] = max(worker["rss_mb_max"], usage["rss_mb"])
+        if per_worker:
+            summary["workers"] = per_worker
+        return summary
+
+
+# === REPORT ===
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def latency_stats(samples: List[Sample]) -> dict:
+    latencies = [sample.latency_ms for sample in samples if 200 <= sample.status < 300]
+    errors = [sample for sample in samples if not 200 <= sample.status < 300]
+    return {
+        "requests": len(samples),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(samples), 4) if samples else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies), 1) if latencies else 0.0,
+    }
+
+
+@dataclass
+class Report:
+    label: str
+    config: dict
+    started_at: str
+    elapsed_s: float
+    throughput_rps: float
+    overall: dict
+    by_size: Dict[str, dict] = field(default_factory=dict)
+    encrypted: dict = field(default_factory=dict)
+    duplicates: dict = field(default_factory=dict)
+    status_codes: Dict[str, int] = field(default_factory=dict)
+    resources: dict | None = None
+    resource_errors: int = 0
+    slo: dict = field(default_factory=dict)
+
+
+def build_report(
+    args: argparse.Namespace, samples: List[Sample], elapsed: float, sampler: "ResourceSampler"
+) -> Report:
+    status_codes: Dict[str, int] = {}
+    for sample in samples:
+        status_codes[str(sample.status)] = status_codes.get(str(sample.status), 0) + 1
+    overall = latency_stats(samples)
+    slo = {
+        "p95_ms": args.slo_p95_ms,
+        "error_rate": args.slo_error_rate,
+        "passed": overall["p95_ms"] <= args.slo_p95_ms and overall["error_rate"] <= args.slo_error_rate,
+    }
+    config = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"output", "compare", "password", "label"}
+    }
+    return Report(
+        label=args.label,
+        config=config,
+        started_at=datetime.now().isoformat(timespec="seconds"),
+        elapsed_s=round(elapsed, 2),
+        throughput_rps=round(sum(1 for s in samples if 200 <= s.status < 300) / elapsed, 2),
+        overall=overall,
+        by_size={
+            str(size): latency_stats([s for s in samples if s.transactions == size]) for size in args.sizes
+        },
+        encrypted=latency_stats([s for s in samples if s.encrypted]),
+        duplicates=latency_stats([s for s in samples if s.duplicate]),
+        status_codes=status_codes,
+        resources=sampler.summary(),
+        resource_errors=sampler.errors,
+        slo=slo,
+    )
+
+
+def print_report(report: Report, baseline: dict | None = None) -> None:
+    def delta(current: float, key: str, section: str = "overall") -> str:
+        if not baseline:
+            return ""
+        previous = baseline.get(section, {}).get(key) if section else baseline.get(key)
+        if not previous:
+            return ""
+        return f"  ({(current - previous) / previous * 100:+.1f}% vs {baseline.get('label')})"
+
+    overall = report.overall
+    print(f"=== {report.label} · {report.elapsed_s}s ===")
+    print(f"Throughput   {report.throughput_rps} req/s{delta(report.throughput_rps, 'throughput_rps', '')}")
+    print(f"Requests     {overall['requests']} ({overall['errors']} errores, {overall['error_rate']:.2%})")
+    for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"):
+        print(f"{key:<12} {overall[key]:.1f}{delta(overall[key], key)}")
+    print("Por tamaño:")
+    for size, stats in report.by_size.items():
+        print(f"  {size:>6} tx  p50={stats['p50_ms']:.1f} p95={stats['p95_ms']:.1f} n={stats['requests']}")
+    if report.encrypted.get("requests"):
+        print(f"Cifrados     p95={report.encrypted['p95_ms']:.1f} n={report.encrypted['requests']}")
+    if report.duplicates.get("requests"):
+        print(f"Duplicados   p95={report.duplicates['p95_ms']:.1f} n={report.duplicates['requests']}")
+    print(f"Códigos      {report.status_codes}")
+    if report.resources:
+        print(
+            f"CPU          media {report.resources['cpu_percent_mean']}% · máx {report.resources['cpu_percent_max']}%"
+        )
+        print(f"RSS          media {report.resources['rss_mb_mean']} MB · máx {report.resources['rss_mb_max']} MB")
+    elif report.resource_errors:
+        print(f"CPU/RSS      sin datos ({report.resource_errors} errores de muestreo)")
+    print(f"SLO          {'OK' if report.slo['passed'] else 'FALLA'} (p95 ≤ {report.slo['p95_ms']} ms, errores ≤ {report.slo['error_rate']:.2%})")
+
+
+# === MAIN ===
+def _positive_float(raw: str) -> float:
+    value = float(raw)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"debe ser mayor que 0 (recibido {raw})")
+    return value
+
+
+def _positive_int(raw: str) -> int:
+    value = int(raw)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"debe ser mayor que 0 (recibido {raw})")
+    return value
+
+
+def _ratio(raw: str) -> float:
+    value = float(raw)
+    if not 0.0 <= value <= 1.0:
+        raise argparse.ArgumentTypeError(f"debe estar entre 0 y 1 (recibido {raw})")
+    return value
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8080/api", help="Base URL that serves /analyze")
+    parser.add_argument("--rate", type=_positive_float, default=2.0, help="Target arrival rate (requests/second)")
+    parser.add_argument("--duration", type=_positive_float, default=30.0, help="Test duration in seconds")
+    parser.add_argument("--concurrency", type=_positive_int, default=64, help="Maximum in-flight requests")
+    parser.add_argument(
+        "--sizes",
+        type=lambda raw: [_positive_int(value) for value in raw.split(",")],
+        default=[20, 200, 1000],
+        help="Comma-separated transactions per statement",
+    )
+    parser.add_argument("--encrypted-ratio", type=_ratio, default=0.1)
+    parser.add_argument("--duplicate-rate", type=_ratio, default=0.2)
+    parser.add_argument("--password", default="loadtest")
+    parser.add_argument(
+        "--pool-size",
+        type=_positive_int,
+        help="Distinct statements generated up front (default: enough for the whole run)",
+    )
+    parser.add_argument("--timeout", type=_positive_float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--pid", type=int, help="Local gunicorn/uvicorn master PID to sample CPU/RSS")
+    parser.add_argument(
+        "--container",
+        help='Docker container name or id to sample CPU/RSS, e.g. "$(docker compose ps -q backend)"',
+    )
+    parser.add_argument("--label", default=datetime.now().strftime("run-%Y%m%d-%H%M%S"))
+    parser.add_argument("--slo-p95-ms", type=float, default=2000.0)
+    parser.add_argument("--slo-error-rate", type=float, default=0.01)
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this path")
+    parser.add_argument("--compare", type=Path, help="Previous JSON report to diff against")
+    return parser.parse_args(argv)
+
+
+def run(args: argparse.Namespace) -> Report:
+    rng = random.Random(args.seed)
+    mix = StatementMix(args, rng)
+    sampler = ResourceSampler(args.pid, args.container)
+    if sampler.enabled:
+        # Fail before generating load if the container/PID cannot be sampled at all.
+        sampler.sample()
+    sampler.start()
+
+    samples: List[Sample] = []
+    interval = 1.0 / args.rate
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = []
+        scheduled = started
+        while scheduled < started + args.duration:
+            time.sleep(max(0.0, scheduled - time.perf_counter()))
+            statement, duplicate = mix.next()
+            futures.append(executor.submit(send, args.url, statement, duplicate, scheduled, args.timeout))
+            scheduled += interval
+        samples = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    sampler.stop()
+    return build_report(args, samples, elapsed, sampler)
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv)
+    baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+    try:
+        report = run(args)
+    except SamplingError as exc:
+        print(f"Error: no se pudo muestrear CPU/RSS antes de empezar: {exc}", file=sys.stderr)
+        return 2
+    print_report(report, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(asdict(report), ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nReporte guardado en {args.output}")
+    return 0 if report.slo["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())